@@ -0,0 +1,364 @@
+"""
+Stealth Driver - Undetected Browser Backend (v1.0)
+Part of the Starlight Protocol - Phase 10: Hostile Terrain
+
+Line-delimited JSON-RPC driver the Hub spawns when StealthSentinel
+flags a challenge wall the standard engine cannot cross. Wraps
+seleniumbase's undetected-chromedriver mode behind the same command
+surface as the Node browser adapter: one JSON command per stdin line,
+one JSON response per stdout line.
+
+Concurrency model: commands dispatch onto a small worker pool.
+Navigation and input mutate browser state and serialize behind a narrow
+nav lock, while read-only state queries (url, text, cookies,
+screenshots) run concurrently behind a read gate. CANCEL and SHUTDOWN
+execute inline on the stdin loop: each command captures a cancel
+generation when it is accepted, human-pacing sleeps poll it between
+Selenium calls, and a CANCEL bumps it so commands accepted earlier
+abort instead of waiting out a multi-second navigation.
+"""
+
+import base64
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Responses carry page text and base64 screenshots measured in
+# megabytes; orjson serializes them in C and emits bytes straight for
+# the stdout pipe. Optional, same shim as the SDK's frame serializer
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
+# seleniumbase is only needed on hosts that actually run the stealth
+# engine; the module stays importable without it so the Hub can probe
+try:
+    from seleniumbase import Driver
+    _SELENIUMBASE_AVAILABLE = True
+except ImportError:
+    _SELENIUMBASE_AVAILABLE = False
+
+CONTROL_COMMANDS = frozenset({"CANCEL", "SHUTDOWN"})
+
+
+class StealthDriver:
+    # Concurrent read-only queries allowed against the driver; Selenium
+    # over HTTP tolerates a handful in flight
+    MAX_CONCURRENT_READS = 4
+
+    def __init__(self, config=None):
+        self.config = config or {}
+        self.state = "IDLE"
+        # Nav lock guards state transitions and every mutating command;
+        # read-only queries only take the read gate, so a screenshot or
+        # STATE_SYNC never queues behind a multi-second goto
+        self._nav_lock = threading.Lock()
+        self._read_gate = threading.Semaphore(self.MAX_CONCURRENT_READS)
+        # Monotonic cancel generation. Commands capture it when accepted
+        # off stdin and cancel() bumps it, so a CANCEL preempts exactly
+        # the commands that arrived before it: in-flight ones bail at
+        # their next poll, queued ones abort before touching the
+        # browser, and later commands run normally
+        self._cancel_gen = 0
+        self.sb = None
+        # Automation loops re-send the same base64 scripts; cache the
+        # decoded text keyed by the encoded string (clear-on-full keeps
+        # it bounded without eviction bookkeeping)
+        self._script_cache = {}
+
+    # -- Lifecycle ---------------------------------------------------
+
+    def initialize(self):
+        if not _SELENIUMBASE_AVAILABLE:
+            raise RuntimeError(
+                "seleniumbase is not installed; "
+                "pip install seleniumbase to enable the stealth engine")
+        with self._nav_lock:
+            if self.sb is None:
+                self.sb = Driver(
+                    uc=True,
+                    headless2=self.config.get("headless", True),
+                )
+                self.state = "READY"
+        return {"state": self.state}
+
+    def close(self):
+        with self._nav_lock:
+            if self.sb is not None:
+                try:
+                    self.sb.quit()
+                finally:
+                    self.sb = None
+                    self.state = "CLOSED"
+        return {"state": self.state}
+
+    def cancel(self):
+        """Preempt commands accepted before this point: in-flight ones
+        abort at their next poll, queued ones before they start."""
+        self._cancel_gen += 1
+        return {"state": self.state, "preempted": True}
+
+    def _preempted(self, gen):
+        return gen is not None and gen != self._cancel_gen
+
+    # -- Mutating commands (serialized) ------------------------------
+
+    def goto(self, url, gen=None):
+        if self._preempted(gen):
+            return {"cancelled": True}
+        with self._nav_lock:
+            self.state = "NAVIGATING"
+            self.sb.get(url)
+            self.state = "READY"
+        # Human pacing: challenge walls fingerprint instant interaction
+        # after load. Nothing here touches the driver, so the jitter
+        # sleeps outside the lock and stays preemptible
+        self._pace(random.uniform(2.0, 5.0), gen)
+        return {"url": self.sb.get_current_url()}
+
+    def click(self, selector, gen=None):
+        if self._preempted(gen):
+            return {"cancelled": True}
+        with self._nav_lock:
+            self.sb.click(selector)
+        self._pace(random.uniform(0.2, 0.6), gen)
+        return {"clicked": selector}
+
+    def fill(self, selector, value, gen=None):
+        if self._preempted(gen):
+            return {"cancelled": True}
+        with self._nav_lock:
+            self.sb.type(selector, value)
+        self._pace(random.uniform(0.2, 0.6), gen)
+        return {"filled": selector}
+
+    def evaluate(self, script, encoding=None):
+        if encoding == "base64":
+            decoded = self._script_cache.get(script)
+            if decoded is None:
+                decoded = base64.b64decode(script).decode("utf-8")
+                if len(self._script_cache) >= 64:
+                    self._script_cache.clear()
+                self._script_cache[script] = decoded
+            script = decoded
+        with self._nav_lock:
+            result = self.sb.execute_script(script)
+        return {"result": result}
+
+    def _pace(self, seconds, gen=None):
+        """Sleep in short slices, bailing out on preemption."""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if self._preempted(gen):
+                break
+            time.sleep(0.05)
+
+    # -- Read-only queries (concurrent) ------------------------------
+
+    def get_url(self):
+        with self._read_gate:
+            return {"url": self.sb.get_current_url()}
+
+    def get_page_text(self):
+        with self._read_gate:
+            return {"text": self.sb.get_page_source()}
+
+    def get_cookies(self):
+        with self._read_gate:
+            return {"cookies": self.sb.driver.get_cookies()}
+
+    def get_storage(self):
+        with self._read_gate:
+            local_storage = self.sb.execute_script(
+                "return JSON.stringify(window.localStorage)")
+            session_storage = self.sb.execute_script(
+                "return JSON.stringify(window.sessionStorage)")
+        return {
+            "localStorage": _loads(local_storage),
+            "sessionStorage": _loads(session_storage),
+        }
+
+    def screenshot(self):
+        # Raw PNG bytes plus one b64encode: get_screenshot_as_base64
+        # would build an intermediate encoded str inside selenium just
+        # for us to embed it again
+        with self._read_gate:
+            png = self.sb.driver.get_screenshot_as_png()
+        return {"data_b64": base64.b64encode(png).decode("ascii")}
+
+    def state_sync(self):
+        return {"state": self.state}
+
+    # -- Dispatch ----------------------------------------------------
+
+    def dispatch(self, command, gen=None):
+        cmd = command.get("cmd", "")
+        params = command.get("params", {})
+        handlers = {
+            "INITIALIZE": lambda: self.initialize(),
+            "GOTO": lambda: self.goto(params["url"], gen),
+            "CLICK": lambda: self.click(params["selector"], gen),
+            "FILL": lambda: self.fill(
+                params["selector"], params["value"], gen),
+            "EVALUATE": lambda: self.evaluate(
+                params["script"], params.get("encoding")),
+            "GET_URL": self.get_url,
+            "GET_PAGE_TEXT": self.get_page_text,
+            "GET_COOKIES": self.get_cookies,
+            "GET_STORAGE": self.get_storage,
+            "SCREENSHOT": self.screenshot,
+            "STATE_SYNC": self.state_sync,
+            "CANCEL": self.cancel,
+            "SHUTDOWN": self.close,
+        }
+        handler = handlers.get(cmd)
+        if handler is None:
+            return {"error": f"Unknown command: {cmd}"}
+        return handler()
+
+
+def _posix_line_batches():
+    """Yield batches of complete stdin lines as they become readable.
+
+    Non-blocking reads behind a selector: the main loop sleeps in
+    epoll/kqueue until bytes arrive instead of a reader thread plus a
+    polling queue, so dispatch latency is one wakeup, not a poll tick.
+    Every complete line buffered at wakeup comes out as one batch."""
+    import fcntl
+    import selectors
+    fd = sys.stdin.fileno()
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    sel = selectors.DefaultSelector()
+    sel.register(fd, selectors.EVENT_READ)
+    buffer = b""
+    while True:
+        sel.select(timeout=None)
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            continue
+        if not data:
+            return  # EOF: the Hub closed our stdin
+        buffer += data
+        batch = []
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            if line.strip():
+                batch.append(line)
+        if batch:
+            yield batch
+
+
+def _threaded_line_batches():
+    """Windows fallback: stdin has no selector support there, so one
+    daemon thread feeds a lock-free SimpleQueue and batches drain it."""
+    lines = queue.SimpleQueue()
+
+    def _reader():
+        for line in sys.stdin:
+            if line.strip():
+                lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=_reader, daemon=True).start()
+    while True:
+        batch = [lines.get()]
+        try:
+            while True:
+                batch.append(lines.get_nowait())
+        except queue.Empty:
+            pass
+        if batch[-1] is None:
+            batch.pop()
+            if batch:
+                yield batch
+            return
+        yield batch
+
+
+# Workers respond as they finish; the lock keeps their line-delimited
+# frames from interleaving on the shared pipe
+_STDOUT_LOCK = threading.Lock()
+
+
+def _respond(msg_id, result):
+    response = {"jsonrpc": "2.0", "id": msg_id}
+    if isinstance(result, dict) and "error" in result:
+        response["error"] = {"code": -32000, "message": result["error"]}
+    else:
+        response["result"] = result
+    payload = _dumps(response) + b"\n"
+    with _STDOUT_LOCK:
+        out = sys.stdout.buffer
+        out.write(payload)
+        out.flush()
+
+
+def _execute(driver, command, gen):
+    msg_id = command.get("id")
+    try:
+        result = driver.dispatch(command, gen)
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    _respond(msg_id, result)
+
+
+def main():
+    driver = StealthDriver()
+    # Sized to the read gate: mutating commands serialize on the nav
+    # lock anyway, so extra threads would only idle on it
+    executor = ThreadPoolExecutor(
+        max_workers=StealthDriver.MAX_CONCURRENT_READS,
+        thread_name_prefix="stealth-cmd")
+    batches = (_threaded_line_batches() if sys.platform == "win32"
+               else _posix_line_batches())
+    for batch in batches:
+        commands = []
+        for line in batch:
+            try:
+                commands.append(_loads(line))
+            except ValueError:
+                continue
+        # Only CANCEL/SHUTDOWN jump the (tiny) ready batch; everything
+        # else keeps arrival order, so a pipelined GOTO + SCREENSHOT
+        # still observes post-navigation state (sort is stable)
+        if len(commands) > 1:
+            commands.sort(
+                key=lambda c: 0 if c.get("cmd") in CONTROL_COMMANDS else 1)
+        for command in commands:
+            cmd = command.get("cmd", "")
+            if cmd == "SHUTDOWN":
+                # Preempt in-flight work, let the workers drain, then
+                # close the browser on this thread
+                driver.cancel()
+                executor.shutdown(wait=True)
+                _execute(driver, command, None)
+                return
+            if cmd == "CANCEL":
+                # Inline on the stdin loop: queued behind the workers it
+                # is meant to preempt, it could never reach them in time
+                _execute(driver, command, None)
+            else:
+                executor.submit(_execute, driver, command,
+                                driver._cancel_gen)
+    # EOF: the Hub closed our stdin; finish what is already in flight
+    executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
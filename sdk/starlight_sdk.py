@@ -16,6 +16,18 @@ import tempfile
 import shutil
 from abc import ABC, abstractmethod
 
+# Optional fast serializer for outbound frames. orjson encodes 3-10x
+# faster than stdlib json; decode back to str because the Hub expects
+# text websocket frames. Falls back to stdlib when not installed
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj)
+
 class SentinelBase(ABC):
     def __init__(self, layer_name, priority, uri=None):
         # Support HUB_URL environment variable for flexible Hub connection
@@ -25,9 +37,14 @@ class SentinelBase(ABC):
         self.priority = priority
         self.selectors = []
         self.capabilities = []
+        # Optional [w, h] hint: Hubs that support it drop blocking
+        # elements smaller than this before emitting pre_check payloads
+        self.min_blocking_size = None
         self._websocket = None
         self._running = False
         self.memory = {}
+        self._save_task = None  # Pending debounced memory flush
+        self._dirty = False  # Unflushed memory writes exist
         self.last_action = None
         # Stability: Use absolute path in project root, not relative CWD
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -75,6 +92,38 @@ class SentinelBase(ABC):
         except Exception as e:
             print(f"[{self.layer}] Warning: Failed to save memory: {e}")
 
+    def _remember(self, key, value, maxsize=512):
+        """Store a learned pattern, evicting the oldest entries beyond
+        maxsize. Memory is a plain insertion-ordered dict, so long-lived
+        sentinels can't grow it (and every serialized save) without
+        bound; re-inserting a key refreshes its position."""
+        self.memory.pop(key, None)
+        self.memory[key] = value
+        while len(self.memory) > maxsize:
+            del self.memory[next(iter(self.memory))]
+
+    def _schedule_save(self):
+        """
+        Debounced memory flush. Rapid learning bursts (many distinct
+        obstacles during a noisy page load) coalesce into one disk write,
+        and the write itself runs in a thread so json.dump + rename never
+        block the event loop.
+        """
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._debounced_flush())
+
+    async def _debounced_flush(self):
+        # A write can land while _save_memory runs in the thread; it
+        # marks _dirty but schedules nothing (this task isn't done), so
+        # loop until a flush completes with no writes behind it
+        while True:
+            await asyncio.sleep(0.5)
+            self._dirty = False
+            await asyncio.to_thread(self._save_memory)
+            if not self._dirty:
+                break
+
     async def start(self):
         """Main entry point for the sentinel."""
         self._load_memory()
@@ -123,8 +172,13 @@ class SentinelBase(ABC):
             if self._running:
                 await asyncio.sleep(reconnect_delay)
         
-        # Final save on exit
+        # Final save on exit: cancel any pending debounced flush so it
+        # cannot race the synchronous write, then persist directly. A
+        # learn still inside its debounce window would otherwise be lost
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
         self._save_memory()
+        self._dirty = False
         print(f"[{self.layer}] Shutdown complete.")
 
     async def _register(self):
@@ -144,7 +198,9 @@ class SentinelBase(ABC):
             },
             "id": "reg-" + str(int(time.time()))
         }
-        await self._websocket.send(json.dumps(msg))
+        if self.min_blocking_size:
+            msg["params"]["minBlockingSize"] = self.min_blocking_size
+        await self._websocket.send(_dumps(msg))
 
     async def _heartbeat_loop(self):
         interval = self.config.get("sentinel", {}).get("heartbeatInterval", 2)
@@ -156,7 +212,7 @@ class SentinelBase(ABC):
                     "params": {"layer": self.layer},
                     "id": "pulse-" + str(int(time.time()))
                 }
-                await self._websocket.send(json.dumps(msg))
+                await self._websocket.send(_dumps(msg))
                 await asyncio.sleep(interval)
             except websockets.exceptions.ConnectionClosed:
                 break
@@ -211,6 +267,21 @@ class SentinelBase(ABC):
         if key: params["key"] = key
         await self._send_msg("starlight.action", params)
 
+    async def send_action_batch(self, cmd, selectors, stop_on_first_success=True):
+        """
+        Execute one healing action against a list of candidate selectors
+        in a single Hub round-trip. The Hub tries them in order and
+        reports the first selector that succeeded in COMMAND_COMPLETE,
+        so callers can learn the winner instead of guessing. Pass
+        stop_on_first_success=False to have the Hub run the action on
+        every candidate (e.g. sweeping several overlays at once).
+        """
+        await self._send_msg("starlight.action_batch", {
+            "cmd": cmd,
+            "selectors": list(selectors),
+            "stopOnFirstSuccess": stop_on_first_success
+        })
+
     # === Extended Action Methods (v1.2.0) ===
     
     async def send_click(self, selector):
@@ -298,7 +369,7 @@ class SentinelBase(ABC):
         if self._websocket:
             try:
                 msg = self._format_message(method, params, str(int(time.time() * 1000)))
-                await self._websocket.send(json.dumps(msg))
+                await self._websocket.send(_dumps(msg))
             except websockets.exceptions.ConnectionClosed:
                 print(f"[{self.layer}] Cannot send {method}: connection closed")
             except Exception as e:
@@ -39,17 +39,18 @@ class ImageAltRule:
             attrs = element.get("attributes", {})
             alt = attrs.get("alt")
             role = attrs.get("role")
-            aria_label = attrs.get("aria-label")
-            
+            # Strip once; reused by the empty-alt and unhelpful-alt checks
+            stripped = alt.strip() if alt is not None else None
+
             # Skip presentational images
             if role == "presentation" or role == "none":
                 passes += 1
                 continue
-                
+
             # Check for alt attribute
             if alt is None:
                 # Check for aria-label as alternative
-                if aria_label:
+                if attrs.get("aria-label"):
                     passes += 1
                     continue
                     
@@ -63,7 +64,7 @@ class ImageAltRule:
                         "src": attrs.get("src", "")[:100]
                     }
                 })
-            elif alt.strip() == "":
+            elif stripped == "":
                 # Empty alt is valid for decorative images
                 # But we should check if it looks decorative
                 if self._looks_decorative(element):
@@ -82,7 +83,7 @@ class ImageAltRule:
             else:
                 # Has alt text
                 # Check for unhelpful alt text
-                if self._is_unhelpful_alt(alt):
+                if self._is_unhelpful_alt(stripped):
                     violations.append({
                         "rule": self.RULE_ID,
                         "wcag": self.WCAG,
@@ -124,7 +125,7 @@ class ImageAltRule:
             "untitled", "placeholder"
         ]
         
-        alt_lower = alt.lower().strip()
+        alt_lower = alt.lower()
         
         # Exact match to unhelpful terms
         if alt_lower in unhelpful:
@@ -20,6 +20,62 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sdk.starlight_sdk import SentinelBase
 
+# Precompiled once - parsing runs for every computed element in the audit
+_FONT_SIZE_RE = re.compile(r'(\d+(?:\.\d+)?)(px|pt|em|rem)')
+# Fallback for color formats the hand parser doesn't cover (rgba, spaces)
+_RGB_RE = re.compile(r'rgba?\((\d+),\s*(\d+),\s*(\d+)')
+# Tags whose focus indicator matters for WCAG 2.4.7
+_FOCUSABLE_TAGS = frozenset({"A", "BUTTON", "INPUT", "SELECT", "TEXTAREA"})
+
+
+def _parse_rgb(color):
+    """Hand-parse the rigid 'rgb(R, G, B)' form; returns (r, g, b) or None."""
+    if not color.startswith("rgb("):
+        return None
+    end = color.rfind(")")
+    if end < 0:
+        return None
+    parts = color[4:end].split(",")
+    if len(parts) != 3:
+        return None
+    try:
+        return int(parts[0]), int(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+
+
+class Violation:
+    """
+    Compact WCAG violation record.
+
+    Large pages emit thousands of these per audit and they are retained
+    across audits in self.violations, so use __slots__ instead of a dict
+    per record (dataclass slots would need Python 3.10+).
+    """
+
+    __slots__ = ("rule", "wcag", "impact", "selector", "message", "data")
+
+    def __init__(self, rule, wcag, impact, selector, message, data=None):
+        self.rule = rule
+        self.wcag = wcag
+        self.impact = impact
+        self.selector = selector
+        self.message = message
+        self.data = data
+
+    def as_dict(self):
+        """Expand to a plain dict at the JSON boundary only."""
+        d = {
+            "rule": self.rule,
+            "wcag": self.wcag,
+            "impact": self.impact,
+            "selector": self.selector,
+            "message": self.message,
+        }
+        if self.data is not None:
+            d["data"] = self.data
+        return d
+
 
 class A11ySentinel(SentinelBase):
     """
@@ -50,17 +106,21 @@ class A11ySentinel(SentinelBase):
         self.passes = 0
         self.audit_count = 0
         self.current_url = None
+        self._last_violations_hash = None
+        self._computed_records = []
         
-        # WCAG rules registry
+        # WCAG criterion registry: (rule_id, wcag, required probe fields, handler).
+        # The dispatcher gates on required-field presence so rules whose
+        # evidence is missing from the snapshot are never invoked.
         self.rules = [
-            self._check_color_contrast,
-            self._check_image_alt,
-            self._check_form_labels,
-            self._check_heading_order,
-            self._check_link_names,
-            self._check_button_names,
-            self._check_focus_indicators,
-            self._check_aria_valid,
+            ("color-contrast", "1.4.3", ("computed",), self._check_color_contrast),
+            ("image-alt", "1.1.1", ("elements",), self._check_image_alt),
+            ("form-labels", "1.3.1", ("elements",), self._check_form_labels),
+            ("heading-order", "1.3.1", ("elements",), self._check_heading_order),
+            ("link-name", "2.4.4", ("elements",), self._check_link_names),
+            ("button-name", "4.1.2", ("elements",), self._check_button_names),
+            ("focus-visible", "2.4.7", ("computed",), self._check_focus_indicators),
+            ("aria-valid", "4.1.2", ("elements",), self._check_aria_valid),
         ]
         
     async def on_pre_check(self, params, msg_id):
@@ -79,17 +139,26 @@ class A11ySentinel(SentinelBase):
         
         try:
             if dom_data and (dom_data.get("elements") or dom_data.get("computed")):
+                # Pre-filter computed styles once; the contrast and focus
+                # rules both consume the same flat records instead of each
+                # re-walking the style dicts
+                self._computed_records = self._ingest_computed(
+                    dom_data.get("computed", [])
+                )
+
                 # Run all WCAG rules
                 violations = []
                 passes = 0
                 
-                for rule_fn in self.rules:
+                for rule_id, wcag, required, rule_fn in self.rules:
+                    if not all(dom_data.get(field) for field in required):
+                        continue
                     try:
-                        result = await rule_fn(dom_data)
+                        result = rule_fn(dom_data)
                         violations.extend(result.get("violations", []))
                         passes += result.get("passes", 0)
                     except Exception as e:
-                        print(f"[{self.layer}] Rule error: {e}")
+                        print(f"[{self.layer}] Rule error ({rule_id}): {e}")
                 
                 self.violations = violations
                 self.passes = passes
@@ -110,6 +179,28 @@ class A11ySentinel(SentinelBase):
         # Always clear - accessibility issues do NOT block execution
         await self.send_clear()
         
+    def _ingest_computed(self, computed):
+        """
+        Flatten the computed-style snapshot into one record per element:
+        (tag, selector, has_text, fg, bg, font_size_px, outline_removed,
+        has_shadow). Built once per audit so the contrast and focus rules
+        scan flat tuples instead of chasing nested style dicts.
+        """
+        records = []
+        for element in computed:
+            styles = element.get("styles", {})
+            records.append((
+                element.get("tag", "").upper(),
+                element.get("selector"),
+                bool(element.get("text")),
+                styles.get("color"),
+                styles.get("backgroundColor"),
+                self._parse_font_size(styles.get("fontSize", "16px")),
+                "none" in styles.get("outline", "").lower(),
+                bool(styles.get("boxShadow")),
+            ))
+        return records
+
     async def _request_dom_snapshot(self):
         """Request DOM snapshot from Hub via action."""
         try:
@@ -123,6 +214,15 @@ class A11ySentinel(SentinelBase):
             
     async def _report_violations(self, violations):
         """Send violations to Hub via starlight.context_update (protocol compliant)."""
+        # Skip the send entirely when findings are identical to the last
+        # audit (common on static pages under repeated pre_checks)
+        violations_hash = hash(tuple(
+            (v.rule, v.selector, v.message) for v in violations
+        ))
+        if violations_hash == self._last_violations_hash:
+            return
+        self._last_violations_hash = violations_hash
+
         score = self._calculate_score(violations)
         
         # Use starlight.context_update format per protocol spec
@@ -134,7 +234,7 @@ class A11ySentinel(SentinelBase):
                     "accessibility": {
                         "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
                         "url": self.current_url,
-                        "violations": violations,
+                        "violations": [v.as_dict() for v in violations],
                         "passes": self.passes,
                         "score": score,
                         "level": self._get_level(score)
@@ -155,7 +255,7 @@ class A11ySentinel(SentinelBase):
         # Weight by impact
         weights = {"critical": 25, "serious": 15, "moderate": 5, "minor": 1}
         total_deduction = sum(
-            weights.get(v.get("impact", "minor"), 1) 
+            weights.get(v.impact, 1)
             for v in violations
         )
         
@@ -178,39 +278,32 @@ class A11ySentinel(SentinelBase):
     # WCAG 2.1 AA Rules
     # ─────────────────────────────────────────────────────────────────
     
-    async def _check_color_contrast(self, dom_data):
+    def _check_color_contrast(self, dom_data):
         """
         WCAG 1.4.3 - Minimum Contrast (Level AA)
         Text must have 4.5:1 contrast ratio (3:1 for large text)
         """
         violations = []
         passes = 0
-        
-        for element in dom_data.get("computed", []):
-            styles = element.get("styles", {})
-            fg = styles.get("color")
-            bg = styles.get("backgroundColor")
-            
-            if fg and bg and element.get("text"):
+
+        for tag, selector, has_text, fg, bg, font_size, _, _ in self._computed_records:
+            if fg and bg and has_text:
                 ratio = self._calculate_contrast_ratio(fg, bg)
-                font_size = self._parse_font_size(styles.get("fontSize", "16px"))
-                
+
                 min_ratio = 3.0 if font_size >= 18 else 4.5
-                
+
                 if ratio < min_ratio:
-                    violations.append({
-                        "rule": "color-contrast",
-                        "wcag": "1.4.3",
-                        "impact": "serious",
-                        "selector": element.get("selector", "unknown"),
-                        "message": f"Contrast ratio {ratio:.1f}:1 is below {min_ratio}:1 minimum"
-                    })
+                    violations.append(Violation(
+                        "color-contrast", "1.4.3", "serious",
+                        selector or "unknown",
+                        f"Contrast ratio {ratio:.1f}:1 is below {min_ratio}:1 minimum"
+                    ))
                 else:
                     passes += 1
-                    
+
         return {"violations": violations, "passes": passes}
         
-    async def _check_image_alt(self, dom_data):
+    def _check_image_alt(self, dom_data):
         """
         WCAG 1.1.1 - Non-text Content (Level A)
         Images must have alt attributes
@@ -223,13 +316,11 @@ class A11ySentinel(SentinelBase):
                 alt = element.get("attributes", {}).get("alt")
                 
                 if alt is None:
-                    violations.append({
-                        "rule": "image-alt",
-                        "wcag": "1.1.1",
-                        "impact": "critical",
-                        "selector": element.get("selector", "img"),
-                        "message": "Image missing alt attribute"
-                    })
+                    violations.append(Violation(
+                        "image-alt", "1.1.1", "critical",
+                        element.get("selector", "img"),
+                        "Image missing alt attribute"
+                    ))
                 elif alt.strip() == "":
                     # Empty alt is OK for decorative images
                     passes += 1
@@ -238,7 +329,7 @@ class A11ySentinel(SentinelBase):
                     
         return {"violations": violations, "passes": passes}
         
-    async def _check_form_labels(self, dom_data):
+    def _check_form_labels(self, dom_data):
         """
         WCAG 1.3.1 - Info and Relationships (Level A)
         Form inputs must have associated labels
@@ -264,63 +355,55 @@ class A11ySentinel(SentinelBase):
                 )
                 
                 if not has_label:
-                    violations.append({
-                        "rule": "form-labels",
-                        "wcag": "1.3.1",
-                        "impact": "serious",
-                        "selector": element.get("selector", tag.lower()),
-                        "message": f"{tag.lower()} element missing label"
-                    })
+                    violations.append(Violation(
+                        "form-labels", "1.3.1", "serious",
+                        element.get("selector", tag.lower()),
+                        f"{tag.lower()} element missing label"
+                    ))
                 else:
                     passes += 1
                     
         return {"violations": violations, "passes": passes}
         
-    async def _check_heading_order(self, dom_data):
+    def _check_heading_order(self, dom_data):
         """
         WCAG 1.3.1 - Info and Relationships (Level A)
         Headings should follow logical order (h1 -> h2 -> h3)
         """
         violations = []
         passes = 0
-        
-        headings = []
+
+        # Single pass in document order - headings feed a tiny state machine
+        # directly instead of being collected into an intermediate list first
+        prev_level = 0
         for element in dom_data.get("elements", []):
             tag = element.get("tag", "").upper()
-            if tag in ["H1", "H2", "H3", "H4", "H5", "H6"]:
-                level = int(tag[1])
-                headings.append({"level": level, "selector": element.get("selector")})
-                
-        prev_level = 0
-        for heading in headings:
-            level = heading["level"]
-            
+            if tag not in ["H1", "H2", "H3", "H4", "H5", "H6"]:
+                continue
+            level = int(tag[1])
+
             # First heading should be h1
             if prev_level == 0 and level != 1:
-                violations.append({
-                    "rule": "heading-order",
-                    "wcag": "1.3.1",
-                    "impact": "moderate",
-                    "selector": heading["selector"],
-                    "message": f"First heading should be h1, found h{level}"
-                })
+                violations.append(Violation(
+                        "heading-order", "1.3.1", "moderate",
+                        element.get("selector"),
+                        f"First heading should be h1, found h{level}"
+                    ))
             # Shouldn't skip levels
             elif level > prev_level + 1:
-                violations.append({
-                    "rule": "heading-order",
-                    "wcag": "1.3.1",
-                    "impact": "moderate",
-                    "selector": heading["selector"],
-                    "message": f"Heading h{level} skips level (previous was h{prev_level})"
-                })
+                violations.append(Violation(
+                        "heading-order", "1.3.1", "moderate",
+                        element.get("selector"),
+                        f"Heading h{level} skips level (previous was h{prev_level})"
+                    ))
             else:
                 passes += 1
-                
+
             prev_level = level
-            
+
         return {"violations": violations, "passes": passes}
         
-    async def _check_link_names(self, dom_data):
+    def _check_link_names(self, dom_data):
         """
         WCAG 2.4.4 - Link Purpose (Level A)
         Links must have discernible text
@@ -334,27 +417,23 @@ class A11ySentinel(SentinelBase):
                 aria_label = element.get("attributes", {}).get("aria-label")
                 
                 if not text and not aria_label:
-                    violations.append({
-                        "rule": "link-name",
-                        "wcag": "2.4.4",
-                        "impact": "serious",
-                        "selector": element.get("selector", "a"),
-                        "message": "Link has no accessible name"
-                    })
+                    violations.append(Violation(
+                        "link-name", "2.4.4", "serious",
+                        element.get("selector", "a"),
+                        "Link has no accessible name"
+                    ))
                 elif text.lower() in ["click here", "here", "more", "read more"]:
-                    violations.append({
-                        "rule": "link-name",
-                        "wcag": "2.4.4",
-                        "impact": "minor",
-                        "selector": element.get("selector", "a"),
-                        "message": f"Link text '{text}' is not descriptive"
-                    })
+                    violations.append(Violation(
+                        "link-name", "2.4.4", "minor",
+                        element.get("selector", "a"),
+                        f"Link text '{text}' is not descriptive"
+                    ))
                 else:
                     passes += 1
                     
         return {"violations": violations, "passes": passes}
         
-    async def _check_button_names(self, dom_data):
+    def _check_button_names(self, dom_data):
         """
         WCAG 4.1.2 - Name, Role, Value (Level A)
         Buttons must have accessible names
@@ -371,48 +450,39 @@ class A11ySentinel(SentinelBase):
                 aria_label = element.get("attributes", {}).get("aria-label")
                 
                 if not text and not aria_label:
-                    violations.append({
-                        "rule": "button-name",
-                        "wcag": "4.1.2",
-                        "impact": "critical",
-                        "selector": element.get("selector", "button"),
-                        "message": "Button has no accessible name"
-                    })
+                    violations.append(Violation(
+                        "button-name", "4.1.2", "critical",
+                        element.get("selector", "button"),
+                        "Button has no accessible name"
+                    ))
                 else:
                     passes += 1
                     
         return {"violations": violations, "passes": passes}
         
-    async def _check_focus_indicators(self, dom_data):
+    def _check_focus_indicators(self, dom_data):
         """
         WCAG 2.4.7 - Focus Visible (Level AA)
         Interactive elements should have visible focus indicators
         """
         violations = []
         passes = 0
-        
-        for element in dom_data.get("computed", []):
-            tag = element.get("tag", "").upper()
-            
-            if tag in ["A", "BUTTON", "INPUT", "SELECT", "TEXTAREA"]:
-                styles = element.get("styles", {})
-                outline = styles.get("outline", "")
-                
-                # Check if outline is explicitly removed
-                if "none" in outline.lower() and not styles.get("boxShadow"):
-                    violations.append({
-                        "rule": "focus-visible",
-                        "wcag": "2.4.7",
-                        "impact": "serious",
-                        "selector": element.get("selector", tag.lower()),
-                        "message": "Focus indicator removed without alternative"
-                    })
+
+        for tag, selector, _, _, _, _, outline_removed, has_shadow in self._computed_records:
+            if tag in _FOCUSABLE_TAGS:
+                # Outline explicitly removed without a box-shadow alternative
+                if outline_removed and not has_shadow:
+                    violations.append(Violation(
+                        "focus-visible", "2.4.7", "serious",
+                        selector or tag.lower(),
+                        "Focus indicator removed without alternative"
+                    ))
                 else:
                     passes += 1
-                    
+
         return {"violations": violations, "passes": passes}
         
-    async def _check_aria_valid(self, dom_data):
+    def _check_aria_valid(self, dom_data):
         """
         WCAG 4.1.2 - Name, Role, Value (Level A)
         ARIA attributes must be valid
@@ -442,13 +512,11 @@ class A11ySentinel(SentinelBase):
             role = attrs.get("role")
             
             if role and role.lower() not in valid_roles:
-                violations.append({
-                    "rule": "aria-valid",
-                    "wcag": "4.1.2",
-                    "impact": "critical",
-                    "selector": element.get("selector", "unknown"),
-                    "message": f"Invalid ARIA role: '{role}'"
-                })
+                violations.append(Violation(
+                        "aria-valid", "4.1.2", "critical",
+                        element.get("selector", "unknown"),
+                        f"Invalid ARIA role: '{role}'"
+                    ))
             elif role:
                 passes += 1
                 
@@ -473,12 +541,16 @@ class A11ySentinel(SentinelBase):
             
     def _get_luminance(self, color):
         """Calculate relative luminance of a color."""
-        # Parse rgb(r, g, b) format
-        match = re.match(r'rgb\((\d+),\s*(\d+),\s*(\d+)\)', color)
-        if not match:
-            return 0.5
-            
-        r, g, b = [int(x) / 255 for x in match.groups()]
+        # Hot path: hand parser for the rigid rgb(r, g, b) format
+        rgb = _parse_rgb(color)
+        if rgb is None:
+            # Fallback regex also accepts rgba(...) prefixes
+            match = _RGB_RE.match(color)
+            if not match:
+                return 0.5
+            rgb = (int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+        r, g, b = [x / 255 for x in rgb]
         
         # Apply gamma correction
         r = r / 12.92 if r <= 0.03928 else ((r + 0.055) / 1.055) ** 2.4
@@ -489,13 +561,20 @@ class A11ySentinel(SentinelBase):
         
     def _parse_font_size(self, size_str):
         """Parse font size string to pixels."""
-        match = re.match(r'(\d+(?:\.\d+)?)(px|pt|em|rem)', size_str)
+        # Fast path: computed styles are almost always "<number>px"
+        if size_str.endswith("px"):
+            try:
+                return float(size_str[:-2])
+            except ValueError:
+                pass
+
+        match = _FONT_SIZE_RE.match(size_str)
         if not match:
             return 16
-            
+
         value = float(match.group(1))
         unit = match.group(2)
-        
+
         if unit == "pt":
             return value * 1.333
         elif unit in ["em", "rem"]:
@@ -21,25 +21,30 @@ class DataSentinel(SentinelBase):
         self.selectors = []  # No blocking patterns to watch
         self.last_extraction = 0
         self.extraction_interval = 5  # seconds between extractions
+        self._last_intelligence = None  # Dirty-check state for context pushes
 
     async def on_pre_check(self, params, msg_id):
         """Extract metadata from pre-check context and inject intelligence."""
         command = params.get("command", {})
-        
-        # Extract real data from the command context
-        intelligence = {
-            "lastCommand": command.get("cmd"),
-            "lastGoal": command.get("goal"),
-            "lastUrl": command.get("url"),
-            "extractionTimestamp": time.ctime(),
-            "sentinelStatus": "ACTIVE"
-        }
-        
-        # Only inject if we have meaningful data
-        if any([command.get("cmd"), command.get("goal"), command.get("url")]):
-            await self.update_context(intelligence)
-            print(f"[{self.layer}] Injected context: cmd={command.get('cmd')}, goal={command.get('goal')}")
-        
+        cmd = command.get("cmd")
+        goal = command.get("goal")
+        url = command.get("url")
+
+        # Only inject if we have meaningful data AND it changed since the
+        # last push - steady-state re-checks repeat the same command, and
+        # re-sending an identical context frame every tick is pure waste
+        fingerprint = (cmd, goal, url)
+        if any(fingerprint) and fingerprint != self._last_intelligence:
+            self._last_intelligence = fingerprint
+            await self.update_context({
+                "lastCommand": cmd,
+                "lastGoal": goal,
+                "lastUrl": url,
+                "extractionTimestamp": time.ctime(),
+                "sentinelStatus": "ACTIVE"
+            })
+            print(f"[{self.layer}] Injected context: cmd={cmd}, goal={goal}")
+
         # Always clear - we don't block commands
         await self.send_clear()
 
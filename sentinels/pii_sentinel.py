@@ -10,24 +10,56 @@ import asyncio
 import re
 import sys
 import os
+from functools import lru_cache
 
 # Path boilerplate for local imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sdk.starlight_sdk import SentinelBase
 
+# Precomputed star runs: redaction of typical PII lengths becomes a
+# tuple index instead of a fresh "*" * n allocation per match
+_STARS = tuple("*" * n for n in range(64))
+
+
+@lru_cache(maxsize=2048)
+def _redact(value):
+    """Redact a sensitive value for logging. Module-level and memoized:
+    the same emails/numbers recur across ticks, and an instance-bound
+    lru_cache would pin the sentinel alive."""
+    if len(value) <= 4:
+        return "****"
+    n = len(value) - 4
+    stars = _STARS[n] if n < 64 else "*" * n
+    return value[:2] + stars + value[-2:]
+
 class PIISentinel(SentinelBase):
+    # Compiled patterns shared across instances, keyed by the custom
+    # pattern config. Reconnect cycles recreate sentinels; the regex
+    # compilation should happen once per config shape, not per instance
+    _PATTERN_CACHE = {}
+
     def __init__(self):
         super().__init__(layer_name="PIISentinel", priority=2)  # High priority - security first
         self.capabilities = ["pii-detection", "compliance"]
-        
+
         # Load PII config
         pii_config = self.config.get("pii", {})
         self.mode = pii_config.get("mode", "alert")  # "alert", "block", or "redact"
-        self.patterns = self._compile_patterns(pii_config.get("patterns", {}))
+        self.patterns, self._combined, self._fallback_patterns = \
+            self._compile_patterns(pii_config.get("patterns", {}))
         self.detected_pii = []
-        
+
     def _compile_patterns(self, custom_patterns):
-        """Compile regex patterns for PII detection."""
+        """Compile regex patterns for PII detection, cached per config."""
+        key = frozenset(custom_patterns.items())
+        cached = PIISentinel._PATTERN_CACHE.get(key)
+        if cached is None:
+            cached = self._compile_patterns_impl(custom_patterns)
+            PIISentinel._PATTERN_CACHE[key] = cached
+        return cached
+
+    def _compile_patterns_impl(self, custom_patterns):
+        """Build the (compiled, combined, fallback) pattern structures."""
         # Default patterns for common PII types
         default_patterns = {
             "email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
@@ -47,30 +79,53 @@ class PIISentinel(SentinelBase):
                 compiled[name] = re.compile(pattern, re.IGNORECASE)
             except re.error as e:
                 print(f"[{self.layer}] Warning: Invalid regex for {name}: {e}")
-        
-        return compiled
-    
+
+        # Combine everything into one alternation with named groups so
+        # scan_for_pii walks the text once instead of once per pattern.
+        # Custom pattern names that aren't valid group identifiers stay
+        # in a per-pattern fallback loop
+        fallback = {
+            n: p for n, p in compiled.items() if not n.isidentifier()
+        }
+        combinable = [(n, all_patterns[n]) for n in compiled
+                      if n not in fallback]
+        combined = None
+        if combinable:
+            try:
+                combined = re.compile(
+                    "|".join(f"(?P<{n}>{p})" for n, p in combinable),
+                    re.IGNORECASE
+                )
+            except re.error as e:
+                print(f"[{self.layer}] Warning: Could not combine PII patterns: {e}")
+                fallback = dict(compiled)
+
+        return compiled, combined, fallback
+
     def scan_for_pii(self, text):
         """Scan text for PII patterns. Returns list of findings."""
         findings = []
-        
-        for pii_type, pattern in self.patterns.items():
+
+        if self._combined is not None:
+            for m in self._combined.finditer(text):
+                value = m.group()
+                findings.append({
+                    "type": m.lastgroup,
+                    "value": _redact(value),  # Never log actual PII
+                    "raw_length": len(value)
+                })
+
+        for pii_type, pattern in self._fallback_patterns.items():
             matches = pattern.findall(text)
             for match in matches:
                 findings.append({
                     "type": pii_type,
-                    "value": self._redact(match),  # Never log actual PII
+                    "value": _redact(match),
                     "raw_length": len(match)
                 })
-        
+
         return findings
-    
-    def _redact(self, value):
-        """Redact sensitive value for logging."""
-        if len(value) <= 4:
-            return "****"
-        return value[:2] + "*" * (len(value) - 4) + value[-2:]
-    
+
     async def on_pre_check(self, params, msg_id):
         """Scan page content for PII before execution."""
         self.detected_pii = []
@@ -78,35 +133,45 @@ class PIISentinel(SentinelBase):
         # Get page text from blocking elements or request page scan
         blocking = params.get("blocking", [])
         page_text = params.get("page_text", "")
-        
-        # Scan any text content we have access to
-        all_text = page_text
-        for element in blocking:
-            all_text += " " + element.get("text", "")
-        
-        if all_text.strip():
-            findings = self.scan_for_pii(all_text)
-            
-            if findings:
-                self.detected_pii = findings
-                types_found = list(set(f["type"] for f in findings))
-                
-                print(f"[{self.layer}] ⚠️  PII DETECTED: {len(findings)} instances of {types_found}")
-                
-                if self.mode == "block":
-                    print(f"[{self.layer}] 🚫 BLOCKING execution - PII found in page")
-                    await self.send_hijack(f"PII Compliance Block: {types_found}")
-                    # Log the event but don't proceed
-                    await self._log_pii_event(findings, blocked=True)
-                    await asyncio.sleep(2)
-                    await self.send_resume(re_check=False)
-                    return
-                elif self.mode == "alert":
-                    print(f"[{self.layer}] ⚠️  ALERT: Proceeding with PII warning")
-                    await self._log_pii_event(findings, blocked=False)
-        
+
+        # Scan each text source as its own chunk: repeatedly
+        # concatenating element texts onto a large page_text reallocates
+        # the whole string per element, and findings don't need global
+        # offsets anyway
+        findings = []
+        for chunk in self._iter_text_chunks(page_text, blocking):
+            findings.extend(self.scan_for_pii(chunk))
+
+        if findings:
+            self.detected_pii = findings
+            types_found = list(set(f["type"] for f in findings))
+
+            print(f"[{self.layer}] ⚠️  PII DETECTED: {len(findings)} instances of {types_found}")
+
+            if self.mode == "block":
+                print(f"[{self.layer}] 🚫 BLOCKING execution - PII found in page")
+                await self.send_hijack(f"PII Compliance Block: {types_found}")
+                # Log the event but don't proceed
+                await self._log_pii_event(findings, blocked=True)
+                await asyncio.sleep(2)
+                await self.send_resume(re_check=False)
+                return
+            elif self.mode == "alert":
+                print(f"[{self.layer}] ⚠️  ALERT: Proceeding with PII warning")
+                await self._log_pii_event(findings, blocked=False)
+
         # Clear for execution
         await self.send_clear()
+
+    @staticmethod
+    def _iter_text_chunks(page_text, blocking):
+        """Yield each non-empty text source without concatenating them."""
+        if page_text and page_text.strip():
+            yield page_text
+        for element in blocking:
+            text = element.get("text", "")
+            if text and text.strip():
+                yield text
     
     async def _log_pii_event(self, findings, blocked):
         """Log PII detection event to sovereign context."""
@@ -14,6 +14,7 @@ License: MIT
 
 import asyncio
 import json
+import re
 import sys
 import os
 
@@ -21,6 +22,10 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sdk.starlight_sdk import SentinelBase
 
+# Translate table stripping CSS selector punctuation from patterns in a
+# single C-level pass, built once at import
+_STRIP = str.maketrans('', '', '.#[]')
+
 
 class ResponsiveSentinel(SentinelBase):
     """
@@ -29,52 +34,74 @@ class ResponsiveSentinel(SentinelBase):
     Capabilities: ["responsive", "mobile", "detection"]
     Priority: 6 (Medium - after Pulse, before Data)
     """
-    
+
+    # Pattern tables live on the class as immutable tuples: every
+    # instance (and reconnect cycle) shares the same objects instead of
+    # re-allocating the string lists per construct
+
+    # Mobile-specific blocking patterns
+    MOBILE_PATTERNS = (
+        # Navigation overlays
+        ".mobile-menu",
+        ".hamburger-menu",
+        "[data-mobile-nav]",
+        ".mobile-nav-overlay",
+        ".nav-drawer",
+        ".side-menu.open",
+
+        # Sticky elements that cover content
+        ".sticky-footer.visible",
+        ".fixed-bottom-bar",
+        ".app-install-banner",
+        ".smart-app-banner",
+
+        # Mobile popups
+        ".mobile-popup",
+        ".mobile-modal",
+        "[data-mobile-only]",
+        ".download-app-modal",
+
+        # Cookie/consent on mobile
+        ".mobile-cookie-banner",
+        ".bottom-sheet.consent"
+    )
+
+    # Close button patterns for mobile overlays
+    CLOSE_PATTERNS = (
+        ".mobile-menu-close",
+        ".hamburger-close",
+        "[data-close-nav]",
+        ".banner-dismiss",
+        ".close-app-banner",
+        "button[aria-label*='close']",
+        "button[aria-label*='dismiss']"
+    )
+
     def __init__(self):
         super().__init__(
             layer_name="ResponsiveSentinel",
             priority=6
         )
         self.capabilities = ["responsive", "mobile", "detection"]
-        
-        # Mobile-specific blocking patterns
-        self.mobile_patterns = [
-            # Navigation overlays
-            ".mobile-menu",
-            ".hamburger-menu", 
-            "[data-mobile-nav]",
-            ".mobile-nav-overlay",
-            ".nav-drawer",
-            ".side-menu.open",
-            
-            # Sticky elements that cover content
-            ".sticky-footer.visible",
-            ".fixed-bottom-bar",
-            ".app-install-banner",
-            ".smart-app-banner",
-            
-            # Mobile popups
-            ".mobile-popup",
-            ".mobile-modal",
-            "[data-mobile-only]",
-            ".download-app-modal",
-            
-            # Cookie/consent on mobile
-            ".mobile-cookie-banner",
-            ".bottom-sheet.consent"
-        ]
-        
-        # Close button patterns for mobile overlays
-        self.close_patterns = [
-            ".mobile-menu-close",
-            ".hamburger-close",
-            "[data-close-nav]",
-            ".banner-dismiss",
-            ".close-app-banner",
-            "button[aria-label*='close']",
-            "button[aria-label*='dismiss']"
-        ]
-        
+
+        self.mobile_patterns = self.MOBILE_PATTERNS
+        self.close_patterns = self.CLOSE_PATTERNS
+
+
+        # Cleaned lowercase token per pattern, computed once, then
+        # collapsed into a single alternation: one regex scan per
+        # selector replaces the per-pattern `in` probes. Longest-first
+        # ordering keeps the most specific pattern winning on overlap
+        self._token_to_pattern = {
+            p.translate(_STRIP).lower(): p for p in self.mobile_patterns
+        }
+        self._mobile_re = re.compile(
+            "|".join(
+                re.escape(t)
+                for t in sorted(self._token_to_pattern, key=len, reverse=True)
+            )
+        )
+
         # Track viewport for mobile detection
         self.current_viewport = {"width": 1920, "height": 1080}
         self.is_mobile_viewport = False
@@ -104,46 +131,54 @@ class ResponsiveSentinel(SentinelBase):
         # Check for mobile-specific blockers in pre_check elements
         elements = params.get("elements", [])
         
-        for pattern in self.mobile_patterns:
-            for element in elements:
-                selector = element.get("selector", "")
-                if self._matches_pattern(selector, pattern):
-                    visible = element.get("visible", False)
-                    if visible:
-                        print(f"[{self.layer}] 🚧 Mobile blocker detected: {pattern}")
-                        await self.send_hijack(f"Mobile obstacle: {pattern}")
-                        
-                        # Try to close the blocker
-                        closed = await self._try_close_blocker(pattern)
-                        
-                        if closed:
-                            print(f"[{self.layer}] ✓ Mobile blocker cleared")
-                        else:
-                            print(f"[{self.layer}] ⚠ Could not auto-clear blocker, hiding element")
-                            await self.send_action("evaluate", f"document.querySelector('{pattern}')?.remove()")
-                        
-                        await self.send_resume(re_check=True)
-                        return
+        # Most elements on a mobile page are offscreen or hidden; filter
+        # them out once so the pattern probes only touch visible ones
+        visible_elements = [e for e in elements if e.get("visible", False)]
+
+        # Element-outer loop: each selector is lowercased exactly once
+        # and matched with a single scan of the combined alternation
+        for element in visible_elements:
+            selector_lower = element.get("selector", "").lower()
+            m = self._mobile_re.search(selector_lower)
+            if m:
+                pattern = self._token_to_pattern[m.group(0)]
+                print(f"[{self.layer}] 🚧 Mobile blocker detected: {pattern}")
+                await self.send_hijack(f"Mobile obstacle: {pattern}")
+
+                # Try to close the blocker
+                closed = await self._try_close_blocker(pattern)
+
+                if closed:
+                    print(f"[{self.layer}] ✓ Mobile blocker cleared")
+                else:
+                    print(f"[{self.layer}] ⚠ Could not auto-clear blocker, hiding element")
+                    await self.send_action("evaluate", f"document.querySelector('{pattern}')?.remove()")
+
+                await self.send_resume(re_check=True)
+                return
         
         # No blockers found
         await self.send_clear()
         
-    def _matches_pattern(self, selector: str, pattern: str) -> bool:
-        """Check if selector matches pattern (simple substring match)."""
-        # Remove special chars for comparison
-        pattern_clean = pattern.replace(".", "").replace("#", "").replace("[", "").replace("]", "")
-        return pattern_clean.lower() in selector.lower()
-        
     async def _try_close_blocker(self, blocker_pattern: str) -> bool:
         """Attempt to close a mobile blocker using known close patterns."""
-        for close_pattern in self.close_patterns:
-            try:
-                await self.send_action("click", close_pattern)
-                await asyncio.sleep(0.3)  # Wait for animation
-                return True
-            except:
-                continue
-        return False
+        # The close attempts are independent best-effort clicks: fire
+        # them all concurrently and settle once, so worst-case latency
+        # is one animation wait instead of one per pattern
+        results = await asyncio.gather(
+            *(self._try_one_close(p) for p in self.close_patterns),
+            return_exceptions=True
+        )
+        await asyncio.sleep(0.3)  # Wait for animation
+        return any(r is True for r in results)
+
+    async def _try_one_close(self, close_pattern: str) -> bool:
+        """Send a single best-effort close click."""
+        try:
+            await self.send_action("click", close_pattern)
+            return True
+        except:
+            return False
         
     async def on_entropy(self, params):
         """Track viewport changes from entropy stream."""
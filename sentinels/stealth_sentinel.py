@@ -0,0 +1,174 @@
+"""
+Stealth Sentinel - Anti-Bot Detection Monitor (v1.0)
+Part of the Starlight Protocol - Phase 10: Hostile Terrain
+
+Recognizes anti-bot and challenge pages (Cloudflare, Akamai, DataDome,
+PerimeterX) from page text so the swarm can wait out interstitials
+instead of hammering a challenge wall.
+"""
+
+import asyncio
+import re
+import sys
+import os
+
+# Path boilerplate for local imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sdk.starlight_sdk import SentinelBase
+
+# Anti-bot fingerprints grouped by system. Each group compiles into one
+# named alternative of a single union regex, so detection is a single
+# scan of the page text no matter how many systems are listed
+ANTI_BOT_PATTERNS = {
+    "cloudflare": [
+        r"checking your browser",
+        r"cloudflare",
+        r"ray id",
+        r"cf-chl",
+    ],
+    "akamai": [
+        r"akamai",
+        r"access[\s-]?denied",
+        r"reference #[0-9a-f]+",
+    ],
+    "datadome": [
+        r"datadome",
+    ],
+    "perimeterx": [
+        r"perimeterx",
+        r"press (?:&|and) hold",
+        r"human verification",
+    ],
+    "generic": [
+        r"bot detection",
+        r"automated traffic",
+        r"unusual activity",
+        r"enable javascript and cookies",
+    ],
+}
+
+# Display names keyed by regex group
+SYSTEM_NAMES = {
+    "cloudflare": "Cloudflare",
+    "akamai": "Akamai",
+    "datadome": "DataDome",
+    "perimeterx": "PerimeterX",
+    "generic": "Generic",
+}
+
+# Interstitial phrases that indicate the challenge resolves itself if we
+# simply wait (as opposed to a hard block)
+WAITING_PATTERNS = [
+    "checking your browser",
+    "please wait",
+    "just a moment",
+    "verifying you are human",
+    "ddos protection",
+]
+
+# Some waiting phrases double as system fingerprints ("checking your
+# browser" is also a Cloudflare signature); the alternation credits such
+# a match to the system group, so the scan re-checks matched text here
+_WAITING_SET = frozenset(WAITING_PATTERNS)
+
+class StealthSentinel(SentinelBase):
+    def __init__(self, uri=None):
+        super().__init__(layer_name="StealthSentinel", priority=3, uri=uri)
+        self.capabilities = ["anti-bot-detection", "stealth"]
+        # Load stealth config
+        stealth_config = self.config.get("stealth", {})
+        self.challenge_wait = stealth_config.get("challengeWaitMs", 4000)
+        # Challenge banners render in the first few KB of page text;
+        # capping the scan keeps pre-check cost constant on long pages
+        self.scan_bytes = stealth_config.get("scanBytes", 8192)
+        # Union of all fingerprints with one named group per system plus
+        # a `waiting` group for interstitial phrases: detection and the
+        # waiting check share a single pass over the page text, and
+        # lastgroup identifies what matched. IGNORECASE avoids a lowered
+        # copy of the page text
+        self._scan_re = re.compile(
+            "|".join(
+                f"(?P<{system}>" + "|".join(patterns) + ")"
+                for system, patterns in ANTI_BOT_PATTERNS.items()
+            )
+            + "|(?P<waiting>" + "|".join(re.escape(p) for p in WAITING_PATTERNS) + ")",
+            re.IGNORECASE
+        )
+        # Veto-wait loops resend the same page_text; cache the last scan
+        # keyed by text hash so retries skip the regex work entirely
+        self._last_text_hash = None
+        self._last_scan = (None, False)
+
+    def _scan(self, page_text):
+        """Single pass over the page text. Returns (system, is_waiting)
+        where system is the detected anti-bot name (or None) and
+        is_waiting flags a self-resolving interstitial."""
+        system = None
+        is_waiting = False
+        for m in self._scan_re.finditer(page_text):
+            group = m.lastgroup
+            if group == "waiting":
+                is_waiting = True
+            else:
+                if system is None:
+                    system = SYSTEM_NAMES[group]
+                if m.group(0).lower() in _WAITING_SET:
+                    is_waiting = True
+            if system is not None and is_waiting:
+                break
+        return system, is_waiting
+
+    async def on_pre_check(self, params, msg_id):
+        """Inspect page text for challenge walls before execution."""
+        page_text = params.get("page_text", "")
+
+        if not page_text:
+            await self.send_clear()
+            return
+
+        # Scan only the head (and a short tail for footer banners):
+        # challenge walls always announce themselves up front, and this
+        # bounds the regex work regardless of page size
+        if len(page_text) > self.scan_bytes:
+            page_text = page_text[:self.scan_bytes] + page_text[-2048:]
+
+        text_hash = hash(page_text)
+        if text_hash == self._last_text_hash:
+            detected_system, is_waiting = self._last_scan
+        else:
+            detected_system, is_waiting = self._scan(page_text)
+            self._last_text_hash = text_hash
+            self._last_scan = (detected_system, is_waiting)
+
+        if detected_system is None:
+            await self.send_clear()
+            return
+
+        if is_waiting:
+            # Interstitial resolves on its own - hold the command
+            print(f"[{self.layer}] {detected_system} interstitial detected, waiting it out")
+            await self.send_wait(self.challenge_wait)
+            return
+
+        # Hard challenge wall: flag it for the swarm but don't block -
+        # the Hub decides whether to abort or reroute
+        print(f"[{self.layer}] ⚠️  {detected_system} challenge wall detected")
+        await self.update_context({"antiBot": {
+            "system": detected_system,
+            "challenge": True
+        }})
+        await self.send_clear()
+
+    async def on_entropy(self, params):
+        """DOM/network activity means the page may have changed."""
+        if params.get("entropy", False):
+            self._last_text_hash = None
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hub_url", default=None, help="Starlight Hub WebSocket URL")
+    args = parser.parse_args()
+
+    sentinel = StealthSentinel(uri=args.hub_url)
+    asyncio.run(sentinel.start())
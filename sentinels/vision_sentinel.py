@@ -7,9 +7,78 @@ Features persistent memory for learned remediation strategies.
 """
 
 import asyncio
+import base64
+import hashlib
+import io
+import logging
+import re
 import sys
 import os
 import httpx
+from collections import OrderedDict
+
+# HTTP/2 lets burst pre-checks multiplex over one connection, but httpx
+# needs the optional h2 package for it; fall back to HTTP/1.1 keepalive
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# The Ollama payload is dominated by the base64 screenshot, which
+# stdlib json encodes character by character; orjson does it in C.
+# Optional, same pattern as the SDK's frame serializer
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+_PROMPT = "What is the main obstacle in this image? (popup, modal, banner, or none)"
+
+# Vision-model prefill cost scales with image tokens, so downscaling a
+# 1920x1080 capture to a 512px thumbnail cuts inference latency more
+# than anything on the Python side. Pillow is optional; without it the
+# screenshot ships at full resolution as before
+try:
+    from PIL import Image
+    _PIL_AVAILABLE = True
+except ImportError:
+    _PIL_AVAILABLE = False
+
+# Multi-megabyte captures make the base64 round trip itself measurable;
+# pybase64 decodes with SIMD lanes where installed, stdlib otherwise
+try:
+    import pybase64
+
+    def _b64decode(data):
+        return pybase64.b64decode(data, validate=False)
+
+    _b64encode = pybase64.b64encode
+except ImportError:
+    _b64decode = base64.b64decode
+    _b64encode = base64.b64encode
+
+# Distinguishes "backend said no obstacle" (cacheable) from "analysis
+# never completed" (timeout/offline/error - must retry next time)
+_ANALYSIS_FAILED = object()
+
+# Obstacle keywords as one compiled alternation: the classifier needs
+# the first keyword in the model's answer, found in a single scan
+# instead of one substring probe per keyword. The optional plural stays
+# outside the group so "popups" still classifies as "popup"
+KW_RE = re.compile(r"\b(popup|modal|banner|overlay|cookie|dialog|alert|window|obstacle)s?\b")
 
 # Path boilerplate for local imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,12 +88,148 @@ class VisionSentinel(SentinelBase):
     def __init__(self):
         super().__init__(layer_name="VisionSentinel", priority=3)
         self.capabilities = ["vision"]
-        
+        # Lazy %-style logging: the raw-response lines run per analysis,
+        # and the logger skips formatting them unless debug is enabled
+        self.log = logging.getLogger(self.layer)
+
+
         # Load from config
         vision_config = self.config.get("vision", {})
         self.model = vision_config.get("model", "moondream")
         self.timeout = vision_config.get("timeout", 25)
         self.ollama_url = vision_config.get("ollamaUrl", "http://localhost:11434/api/generate")
+        self.probe_interval = vision_config.get("probeIntervalSec", 30)
+        # Circuit breaker: while the backend is down, pre-checks clear
+        # immediately instead of each burning the full timeout budget.
+        # The recurring probe flips this back when Ollama returns
+        self._backend_online = False
+        self._offline_hinted = False  # The 'ollama serve' hint prints once
+        # Shared HTTP client: a fresh AsyncClient per analysis paid the
+        # TCP handshake on every pre-check. Created lazily (needs a
+        # running loop) and closed when the sentinel shuts down
+        self._client = None
+        # Screenshot-hash LRU: re-checks and polling resend pixel-
+        # identical screenshots, and each SLM call costs up to the full
+        # timeout budget. Only completed analyses are cached
+        self._vision_cache = OrderedDict()
+        # Single-flight map: overlapping pre-checks with the same
+        # screenshot (Hub broadcasts, retries) share one upstream call
+        # via a future instead of each paying for an inference
+        self._inflight = {}
+        # Micro-batcher: bursts of distinct screenshots within a short
+        # window dispatch as one concurrent gather over the shared
+        # client instead of serial round trips. Queue and drainer are
+        # created in start() (they need the running loop); without them
+        # analyses fall back to direct calls
+        self.max_batch = vision_config.get("maxBatch", 4)
+        self._batch_queue = None
+        # Every field of the request but the screenshot is immutable, so
+        # serialize the template once and splice the base64 in at send
+        # time. Base64 never needs JSON escaping, so raw byte
+        # concatenation is safe
+        self._req_prefix, self._req_suffix = _dumps({
+            "model": self.model,
+            "prompt": _PROMPT,
+            "images": ["__IMG__"],
+            "stream": True
+        }).split(b"__IMG__")
+
+    @staticmethod
+    def _screenshot_key(screenshot_b64):
+        """Digest of the screenshot's base64 head and tail. Slicing
+        bounds the hashing cost on multi-megabyte captures; the two ends
+        differ whenever the image does."""
+        sample = screenshot_b64[:4096] + screenshot_b64[-4096:]
+        return hashlib.blake2b(sample.encode("ascii", "ignore"),
+                               digest_size=16).digest()
+
+    def _get_client(self):
+        """Return the long-lived pooled client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(float(self.timeout), connect=2.0),
+                limits=httpx.Limits(
+                    max_keepalive_connections=10,
+                    max_connections=20,
+                    keepalive_expiry=60.0
+                ),
+                http2=_HTTP2_AVAILABLE
+            )
+        return self._client
+
+    async def start(self):
+        # Probe concurrently with the Hub connection/registration: a
+        # slow or absent backend must not delay joining the swarm, and
+        # the warm connection is ready by the time pre-checks arrive.
+        # The loop keeps re-probing so an outage heals automatically
+        probe_task = asyncio.create_task(self._probe_loop())
+        self._batch_queue = asyncio.Queue()
+        batch_task = asyncio.create_task(self._batch_loop())
+        try:
+            await super().start()
+        finally:
+            for task in (probe_task, batch_task):
+                if not task.done():
+                    task.cancel()
+            if self._client is not None:
+                await self._client.aclose()
+
+    async def _batch_loop(self):
+        """Drain queued analyses in micro-batches: wait for one item,
+        collect up to max_batch more within 50ms, then run the batch
+        concurrently. With HTTP/2 the whole batch multiplexes over one
+        connection; each caller's future gets its own result."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._batch_queue.get()]
+            deadline = loop.time() + 0.05
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(
+                        self._batch_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            results = await asyncio.gather(
+                *(self.analyze_screenshot(b64) for b64, _, _ in batch),
+                return_exceptions=True
+            )
+            for (_, key, fut), result in zip(batch, results):
+                self._inflight.pop(key, None)
+                if not fut.done():
+                    if isinstance(result, BaseException):
+                        fut.set_result(_ANALYSIS_FAILED)
+                    else:
+                        fut.set_result(result)
+
+    async def _probe_loop(self):
+        """Probe at startup, then keep re-probing so the circuit
+        breaker reopens once an Ollama outage ends."""
+        while True:
+            await self._probe_backend()
+            await asyncio.sleep(self.probe_interval)
+
+    async def _probe_backend(self):
+        """One GET against the Ollama root: records backend health for
+        the circuit breaker and leaves a primed keepalive connection
+        waiting for the next inference. Transitions are logged once."""
+        base_url = self.ollama_url.split("/api/")[0]
+        was_online = self._backend_online
+        try:
+            response = await self._get_client().get(base_url)
+            self._backend_online = response.status_code == 200
+            if self._backend_online and not was_online:
+                self.log.info("Ollama backend online at %s", base_url)
+            elif not self._backend_online:
+                self.log.warning("Ollama backend responded %s at %s", response.status_code, base_url)
+        except Exception as e:
+            self._backend_online = False
+            if was_online or not self._offline_hinted:
+                self._offline_hinted = True
+                self.log.warning("Ollama backend unreachable: %s", type(e).__name__)
+                self.log.warning("HINT: Run 'ollama serve' to start the AI backend")
 
     async def on_pre_check(self, params, msg_id):
         screenshot_b64 = params.get("screenshot")
@@ -33,15 +238,52 @@ class VisionSentinel(SentinelBase):
             await self.send_clear()
             return
 
-        print(f"[{self.layer}] Starting AI Analysis ({self.timeout}s Budget)...")
-        obstacle = await self.analyze_screenshot(screenshot_b64)
-        
+        key = self._screenshot_key(screenshot_b64)
+        if key in self._vision_cache:
+            obstacle = self._vision_cache[key]
+            self._vision_cache.move_to_end(key)
+        elif not self._backend_online:
+            # Circuit open: don't burn the timeout budget against a
+            # backend the probe loop knows is down
+            self.log.debug("Ollama offline, clearing without analysis")
+            await self.send_clear()
+            return
+        else:
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                # Identical screenshot already being analyzed; wait for
+                # that result instead of issuing a second inference
+                obstacle = await inflight
+            else:
+                self.log.debug("Starting AI Analysis (%ss Budget)...", self.timeout)
+                fut = asyncio.get_running_loop().create_future()
+                self._inflight[key] = fut
+                if self._batch_queue is not None:
+                    # Batched dispatch: the drainer resolves the future
+                    # and clears the in-flight slot
+                    await self._batch_queue.put((screenshot_b64, key, fut))
+                    obstacle = await fut
+                else:
+                    obstacle = _ANALYSIS_FAILED
+                    try:
+                        obstacle = await self.analyze_screenshot(screenshot_b64)
+                    finally:
+                        self._inflight.pop(key, None)
+                        fut.set_result(obstacle)
+            if obstacle is _ANALYSIS_FAILED:
+                obstacle = None
+            else:
+                self._vision_cache[key] = obstacle
+                if len(self._vision_cache) > 256:
+                    self._vision_cache.popitem(last=False)
+
+
         if obstacle:
-            print(f"[{self.layer}] AI Success: Detected {obstacle}")
+            self.log.info("AI Success: Detected %s", obstacle)
             
             target_selector = self.memory.get(obstacle)
             if target_selector:
-                print(f"[{self.layer}] Phase 7: Recalling resolution for {obstacle} -> {target_selector}")
+                self.log.info("Phase 7: Recalling resolution for %s -> %s", obstacle, target_selector)
             else:
                 target_selector = "button:has-text('Close') >> visible=true"
             
@@ -49,7 +291,9 @@ class VisionSentinel(SentinelBase):
             await self.send_action("click", target_selector)
             self.last_action = {"id": obstacle, "selector": target_selector}
             
-            await asyncio.sleep(1.0)
+            # Short settle only: the resume triggers a re-check anyway,
+            # which catches a close animation that hasn't finished
+            await asyncio.sleep(0.1)
             await self.send_resume(re_check=True)
         else:
             await self.send_clear()
@@ -63,47 +307,95 @@ class VisionSentinel(SentinelBase):
                 obs_id = self.last_action["id"]
                 sel = self.last_action["selector"]
                 if self.memory.get(obs_id) != sel:
-                    print(f"[{self.layer}] Phase 7: Learning AI remediation! {obs_id} -> {sel}")
-                    self.memory[obs_id] = sel
-                    self._save_memory()
+                    self.log.info("Phase 7: Learning AI remediation! %s -> %s", obs_id, sel)
+                    self._remember(obs_id, sel)
+                    # Debounced: bursts of learning coalesce into one
+                    # off-loop disk flush instead of blocking here
+                    self._schedule_save()
             self.last_action = None
 
     async def analyze_screenshot(self, screenshot_b64):
-        prompt = "What is the main obstacle in this image? (popup, modal, banner, or none)"
+        """Classify the screenshot. Returns the obstacle keyword, None
+        for a clean page, or _ANALYSIS_FAILED when the backend call
+        itself did not complete."""
+        # Decode/resize/re-encode is CPU-bound and would stall the event
+        # loop (and every other message handler) for the duration;
+        # Pillow releases the GIL during the heavy parts
+        screenshot_b64 = await asyncio.to_thread(
+            self._preprocess_screenshot, screenshot_b64)
         try:
-            async with httpx.AsyncClient(timeout=float(self.timeout)) as client:
-                response = await client.post(
-                    self.ollama_url,
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "images": [screenshot_b64],
-                        "stream": False
-                    }
-                )
-                
+            # Stream the generation: the classifier only needs the first
+            # obstacle keyword, so the stream closes as soon as one
+            # appears instead of waiting for the full answer
+            body = (self._req_prefix
+                    + screenshot_b64.encode("ascii")
+                    + self._req_suffix)
+            async with self._get_client().stream(
+                "POST",
+                self.ollama_url,
+                content=body,
+                headers=_JSON_HEADERS
+            ) as response:
                 if response.status_code == 200:
-                    answer = response.json().get("response", "").strip().lower()
-                    print(f"[{self.layer}] AI Raw Response: '{answer}'")
-                    
-                    keywords = ["popup", "modal", "banner", "overlay", "cookie", "dialog", "alert", "window", "obstacle"]
-                    for kw in keywords:
-                        if kw in answer: 
-                            return kw
+                    # Rolling buffer so a keyword split across two
+                    # stream events still matches
+                    buf = ""
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        try:
+                            event = _loads(line)
+                        except ValueError:
+                            continue
+                        buf += event.get("response", "")
+                        m = KW_RE.search(buf.lower())
+                        if m:
+                            self.log.debug("AI Raw Response (early exit): %r", buf.strip().lower())
+                            return m.group(1)
+                        if event.get("done"):
+                            break
+                    self.log.debug("AI Raw Response: %r", buf.strip().lower())
                     return None
         except httpx.TimeoutException:
-            print(f"[{self.layer}] AI Analysis timed out after {self.timeout}s")
+            self.log.warning("AI Analysis timed out after %ss", self.timeout)
             await self.update_context({"vision_status": "TIMEOUT", "reason": f"Analysis exceeded {self.timeout}s"})
         except httpx.ConnectError:
-            print(f"[{self.layer}] ERROR: Cannot connect to Ollama at {self.ollama_url}")
-            print(f"[{self.layer}] HINT: Run 'ollama serve' to start the AI backend")
+            self.log.warning("ERROR: Cannot connect to Ollama at %s", self.ollama_url)
+            self.log.warning("HINT: Run 'ollama serve' to start the AI backend")
+            # Trip the breaker now; the probe loop reopens it
+            self._backend_online = False
             await self.update_context({"vision_status": "OFFLINE", "reason": "Ollama unavailable"})
         except Exception as e:
-            print(f"[{self.layer}] AI Analysis failed: {type(e).__name__}: {e}")
+            self.log.warning("AI Analysis failed: %s: %s", type(e).__name__, e)
             await self.update_context({"vision_status": "ERROR", "reason": str(e)})
-        
-        return None
+
+        # Non-200 responses and the exception paths all land here
+        return _ANALYSIS_FAILED
+
+    @staticmethod
+    def _preprocess_screenshot(screenshot_b64):
+        """Downscale the screenshot to a 512px JPEG thumbnail before
+        upload. 'popup vs none' doesn't need full resolution, and the
+        model's prefill dominates analysis latency. Passes the original
+        through when Pillow is missing, the image is already small, or
+        anything about the decode fails."""
+        if not _PIL_AVAILABLE:
+            return screenshot_b64
+        try:
+            raw = _b64decode(screenshot_b64)
+            img = Image.open(io.BytesIO(raw))
+            if max(img.size) <= 512:
+                return screenshot_b64
+            img.thumbnail((512, 512), Image.BILINEAR)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=75)
+            return _b64encode(buf.getvalue()).decode("ascii")
+        except Exception:
+            return screenshot_b64
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(message)s")
     sentinel = VisionSentinel()
     asyncio.run(sentinel.start())
@@ -118,6 +118,7 @@ class CBAHub {
         this.screenshotsDir = path.join(process.cwd(), 'screenshots');
         this.totalSavedTime = 0;
         this.hijackStarts = new Map();
+        this.lastBatchWinner = null; // Winning selector of the latest sentinel action batch
         this.lastEntropyBroadcast = 0;
         this.sovereignState = {};
         this.missionTrace = [];
@@ -1609,6 +1610,9 @@ class CBAHub {
             case 'starlight.action':
                 await this.executeSentinelAction(id, params);
                 break;
+            case 'starlight.action_batch':
+                await this.executeSentinelActionBatch(id, params);
+                break;
             case 'starlight.finish':
                 await this.shutdown(params.reason || params.error);
                 break;
@@ -2079,8 +2083,10 @@ class CBAHub {
                 id: msg.id,
                 success,
                 error: commandError || (success ? null : `Command "${msg.cmd}" failed on ${msg.goal || msg.selector}`),
+                selector: this.lastBatchWinner, // Winning batch candidate, so sentinels can learn it
                 context: this.sovereignState // Phase 4: Return shared context to Intent
             });
+            this.lastBatchWinner = null;
         } finally {
             this.currentCommand = null; // Clear tracking
             this.isProcessing = false;
@@ -2485,6 +2491,37 @@ class CBAHub {
         }
     }
 
+    /**
+     * Batched Sentinel heuristics: try each candidate selector in order
+     * so the sentinel pays one round trip instead of one message per
+     * candidate. Missing candidates are expected (they are guesses);
+     * the first successful one wins and is remembered for learning.
+     */
+    async executeSentinelActionBatch(id, msg) {
+        if (this.lockOwner !== id) return;
+        const selectors = msg.selectors || [];
+        const stopOnFirstSuccess = msg.stopOnFirstSuccess !== false;
+        console.log(`[CBA Hub] Sentinel Action Batch: ${msg.cmd} (${selectors.length} candidates)`);
+
+        let winner = null;
+        for (const selector of selectors) {
+            if (msg.cmd !== 'click') break;
+            try {
+                await this.page.click(selector, { timeout: 2000, force: true });
+                console.log(`[CBA Hub] Sentinel Batch SUCCESS: ${selector}`);
+                winner = selector;
+                if (stopOnFirstSuccess) break;
+            } catch (e) {
+                // Candidate not on this page - try the next one
+            }
+        }
+
+        this.lastBatchWinner = winner;
+        if (!winner) {
+            console.log(`[CBA Hub] Sentinel Batch: no candidate matched`);
+        }
+    }
+
     /**
      * Phase 13: Get page context for NLI parsing.
      * Extracts semantic elements (buttons, inputs, products) to guide the LLM.